@@ -2,8 +2,10 @@
                 HTME | The Hypertext Markup Engine
                 ==================================                          """
 
-from __future__ import print_function, unicode_literals
+from collections import deque
+from itertools import islice
 from types import GeneratorType
+import io, os
 
 # The ASCII global constants...
 
@@ -17,21 +19,30 @@ openbrace, closedbrace, openangle, closedangle = "{", "}", "<", ">"
 
 # The generic helper functions...
 
-def read(path): # TODO: look into `io.open` for unicode (bipy) support
+def read(path):
 
     """This simple helper function wraps `file.read` with the idiomatic
     with-statement, so we can read from a file in a single expression.
     It takes one required arg (`path`) which is a path to the file,
-    and returns the body of the file as a string."""
+    and returns the body of the file as a string.
 
-    with open(path, "r") as file: return file.read()
+    Note: All of the file helpers use `io.open` with UTF-8 encoding, so
+    they work the same way on every platform."""
+
+    # the size of the file (in bytes) is an upper bound on the number of
+    # characters it contains, so the file can be read in a single call (a
+    # size of zero is unknown (pipes etc), so everything is read instead)...
+
+    with io.open(path, "r", encoding="utf-8") as file:
+
+        return file.read(os.fstat(file.fileno()).st_size or -1)
 
 def readlines(path):
 
     """This helper function works just like `read`, but returns the file
     as a list of lines (instead of a string)."""
 
-    with open(path, "r") as file: return file.readlines()
+    with io.open(path, "r", encoding="utf-8") as file: return file.readlines()
 
 def write(content, path):
 
@@ -43,15 +54,31 @@ def write(content, path):
     (replacing anything the file may have already contained) specified
     by the path. Once complete, this function returns `None`."""
 
-    with open(path, "w+") as file: file.write(str(content))
+    with io.open(path, "w+", encoding="utf-8") as file:
+
+        file.write(str(content))
 
 def writelines(lines, path):
 
     """This helper function works just like `write`, but its first arg is
     a string iterable. Each string is written to the file specified by the
-    second arg (`path`) as individual lines."""
+    second arg (`path`) as individual lines.
+
+    Note: The strings are joined into batches (of up to 1024 strings) that
+    are each written in one call, as the text layer is much slower when
+    it encodes and buffers each (potentially tiny) string separately."""
+
+    lines = iter(lines)
+
+    with io.open(path, "w+", encoding="utf-8") as file:
+
+        while True:
+
+            batch = list(islice(lines, 1024))
 
-    with open(path, "w+") as file: file.writelines(lines)
+            if not batch: break
+
+            file.write(empty.join(batch))
 
 def cat(sequence, seperator=""):
 
@@ -70,7 +97,10 @@ def cat(sequence, seperator=""):
     it is often a bit prettier than using `join` directly, especially with
     the default seperator."""
 
-    return seperator.join(str(item) for item in sequence)
+    # a list is passed to `join` (not a generator), so it can size the
+    # result in one pass...
+
+    return seperator.join([str(item) for item in sequence])
 
 def filetype(path, length=1):
 
@@ -93,9 +123,13 @@ def filetype(path, length=1):
     This function is used by `Favicon` to automatically generate the `type`
     attribute from the `path` argument."""
 
-    # split on dots, get `length` parts from the end, join on dots, return
+    # split on dots from the end (only splitting as many times as needed),
+    # get `length` parts from the end, join on dots, return (the common case
+    # (a simple extension) just uses `rpartition` to avoid building lists)
 
-    return cat(path.split(dot)[-length:], dot)
+    if length == 1: return path.rpartition(dot)[2]
+
+    return dot.join(path.rsplit(dot, length)[-length:])
 
 # The library specific helper functions...
 
@@ -132,29 +166,230 @@ def flatten(sequence):
     >>> flatten([DIV, ASIDE]) == flatten([DIV(), ASIDE()])
     True
 
+    The sequence is flattened iteratively (not recursively), so the depth
+    of the nesting is not limited by the recursion limit:
+
+    >>> nested = 0
+    >>> for depth in range(5000): nested = [nested]
+    >>> flatten(nested)
+    [0]
+
     Aside: Other Python Hypertext DSLs use flattening as a core concept. In
     HTME, flattening just happens automatically."""
 
+    # elements are often constructed without children, or with a list or
+    # tuple of children that is already flat (containing no sequences,
+    # dicts, generators or classes), so there is nothing to flatten...
+
+    if isinstance(sequence, (list, tuple)):
+
+        for item in sequence:
+
+            if isinstance(item, (list, tuple, dict, GeneratorType, type)):
+                break
+
+        else: return Nodes(sequence)
+
     results = Nodes()
 
-    terminal = lambda item: not isinstance(item, (list, tuple))
+    # The stack holds an iterator for each level of nesting that is being
+    # flattened. The top iterator is always the one that is being consumed.
+    # It is popped once it is exhausted, so the iterator beneath it resumes
+    # from where it left off:
+
+    stack = deque([iter(sequence)])
+
+    # the `results.append` method is called once per terminal, so it is
+    # bound to a local once here (to avoid looking it up each time)...
+
+    append = results.append
 
-    for item in sequence:
+    while stack:
 
-        # Prevent dicts from being accidently provided as children:
-        if isinstance(item, dict): raise ValueError("dicts cannot be children")
+        for item in stack[-1]:
 
-        # Invoke element classes to convert them to element instances:
-        if type(item) is type and issubclass(item, _Element): item = item()
+            # Prevent dicts from being accidently provided as children:
+            if isinstance(item, dict):
+                raise ValueError("dicts cannot be children")
 
-        # Convert generators to tuples (so generator expressions work as args):
-        elif isinstance(item, GeneratorType): item = tuple(item)
+            # Invoke element classes to convert them to element instances:
+            if isinstance(item, type) and issubclass(item, _Element):
+                item = item()
 
-        # Append a terminal or recursively flattened non-terminal to `results`:
-        results += [item] if terminal(item) else flatten(item)
+            # Convert generators to tuples (so generator expressions work):
+            elif isinstance(item, GeneratorType): item = tuple(item)
+
+            # Append a terminal to `results`, or push a non-terminal onto the
+            # stack, then break, so flattening continues from the new top:
+
+            if not isinstance(item, (list, tuple)): append(item)
+            else:
+                stack.append(iter(item))
+                break
+
+        else: stack.pop()
 
     return results
 
+def _render_nodes(nodes, out):
+
+    """This internal helper takes a sequence of nodes (children) and a list of
+    string fragments (`out`). It renders each node into the list. Elements
+    that use the inherited rendering logic render themselves directly into
+    the list (with `_Element._render_into`), so a tree is rendered in one
+    pass, without building the string for each branch along the way. Any
+    other nodes (strings, numbers, elements with a custom `__repr__`, and
+    so on) are passed to `str`, then appended to the list.
+
+    The function is used by the element renderers, and always returns `None`
+    (the fragments can be concatenated once, at the end, by the caller)."""
+
+    append = out.append
+
+    for node in nodes:
+
+        if isinstance(node, _Element) and node._streams: node._render_into(out)
+        else: append(str(node))
+
+def _render_list(nodes):
+
+    """This internal helper takes a sequence of nodes, and returns them all
+    rendered and concatenated into one string. The nodes are rendered into
+    a single list of fragments (by `_render_nodes`), which is then joined
+    once. It is used by `render_children` and the `Engine` renderers that
+    render the directive element arrays (like `render_installation`)."""
+
+    out = []
+    _render_nodes(nodes, out)
+    return empty.join(out)
+
+def _define(Element, names):
+
+    """This internal helper takes an abstract element class and a string of
+    whitespace-separated class names. It creates a concrete element class
+    for each name (a direct subclass of `Element` that declares no slots of
+    its own), and adds it to the module's globals. It is used to define
+    the concrete void, normal and foreign element classes in a few loops,
+    which is quicker to import than hundreds of class statements:
+
+    >>> type(DIV) is type(IMG) is type(CIRCLE) is _TaggedType
+    True
+
+    >>> DIV.__mro__[1] is NormalElement, DIV.__module__ == __name__
+    (True, True)
+
+    >>> DIV.__slots__
+    ()
+    """
+
+    namespace = globals()
+
+    for name in names.split():
+
+        namespace[name] = type(name, (Element,), {"__slots__": ()})
+
+def _cached(*names):
+
+    """This internal decorator takes the names of one or more engine
+    attributes, and returns a decorator that stores them on the method
+    it decorates (as `method.names`). It is applied to the `Engine`
+    renderers that build an element from those attributes alone, so
+    `Engine._render_cached` can reuse the previous output of each
+    renderer, when the attributes have not changed."""
+
+    def decorator(method):
+
+        method.names = names
+        return method
+
+    return decorator
+
+# the types of the attribute values that can be cached by identity (values
+# of any other types (like elements and lists) may be mutated in place)...
+
+_scalars = str, int, float, bool, type(None)
+
+def _immutable(value):
+
+    """This internal helper takes an attribute value, and returns `True` if
+    the value cannot be mutated in place (so anything derived from it can
+    be cached). That is the case when the type of the value is exactly one
+    of the `_scalars`, or it is exactly a tuple of such values (tuples can
+    be nested). Otherwise, the value may change without the container that
+    holds it being mutated, so the function returns `False`.
+
+    This function is used by `Pairs.sorted` (and doctested by it)."""
+
+    kind = type(value)
+
+    if kind is tuple:
+
+        for each in value:
+            if not _immutable(each): return False
+
+        return True
+
+    return kind in _scalars
+
+def _expand(key):
+
+    """This internal helper takes an attribute name that may be spelled using
+    the shorthand for data attributes (using the dollar prefix). If it is,
+    the dollar is replaced with the `data` prefix and a hyphen. The function
+    returns the name (expanded or unchanged). It is used by `Pairs.sorted`."""
+
+    return "data-" + key[1:] if key.startswith(dollar) else key
+
+def _convert(value):
+
+    """This internal helper function takes an attribute value or the subvalue
+    in a sequential value. It returns the equivalent value, according to the
+    HTME attribute rendering logic (which is always a string or `None`):
+
+    * If `value` is `None`, it is returned.
+    * If `value` is `True`, the string `true` is returned. If `value` is
+      `False`, the string `false` is returned (note the case).
+    * If `value` is a number, the `str` version of `value` is returned.
+    * The subvalues in sequences (that are not `None`) are recursively
+      converted according to the same rules as terminal values, then
+      joined on spaces. The resulting string is returned.
+    * If none of the above, `value` is passed to `str` to ensure it is a
+      string, then any open angle brackets, ampersands and doublequotes
+      are replaced with escape codes (like `&amp;`).
+
+    This function is used by `Pairs.sorted` (and doctested by it)."""
+
+    # the exact types are checked first (as `type(value) is str` is cheaper
+    # than `isinstance`), as strings are by far the most common values...
+
+    kind = type(value)
+
+    if kind is not str:
+
+        if value is None: return value                      # None
+        if value is True: return "true"                     # True
+        if value is False: return "false"                   # False
+        if kind is int or kind is float: return str(value)  # Number
+
+        # then the subclasses of the sequential and numerical types...
+
+        if isinstance(value, (list, tuple)):                # Array
+
+            values = (_convert(each) for each in value if each is not None)
+            return cat(values, space)
+
+        if isinstance(value, (int, float)): return str(value)
+
+        value = str(value)
+
+    # escape the string (the ampersands must be escaped first, so the other
+    # escape codes are not escaped again), using `str.replace`, as it scans
+    # for each character in C, and the characters are usually absent...
+
+    value = value.replace(ampersand, "&amp;")
+    value = value.replace(openangle, "&lt;")
+    return value.replace(doublequote, "&quot;")
+
 # The concrete container classes...
 
 class Pairs(dict):
@@ -163,7 +398,57 @@ class Pairs(dict):
     inherits from `list`. Both classes extended their base classes without
     modifying any inherited functionality. Elements with `attributes` use
     a `Pairs` instance. Those with `children` use `Nodes`. We extend the
-    builtin containers to make them HTML aware."""
+    builtin containers to make them HTML aware.
+
+    Note: The results of `sorted` and `render` are cached, so the methods
+    that mutate the dict are overridden to discard the caches (they still
+    do exactly what the methods they override do). The cache slots are not
+    set by the constructor (which would make every instance much slower to
+    create), so they are read with a default, until they are first set."""
+
+    __slots__ = ("_sorted_cache", "_rendered_cache")
+
+    # the mutating methods, which all discard the cache before mutating...
+
+    def __setitem__(self, key, value):
+
+        self._sorted_cache = self._rendered_cache = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+
+        self._sorted_cache = self._rendered_cache = None
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+
+        self._sorted_cache = self._rendered_cache = None
+        return super().__ior__(other)
+
+    def update(self, *args, **kargs):
+
+        self._sorted_cache = self._rendered_cache = None
+        super().update(*args, **kargs)
+
+    def setdefault(self, key, default=None):
+
+        self._sorted_cache = self._rendered_cache = None
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+
+        self._sorted_cache = self._rendered_cache = None
+        return super().pop(*args)
+
+    def popitem(self):
+
+        self._sorted_cache = self._rendered_cache = None
+        return super().popitem()
+
+    def clear(self):
+
+        self._sorted_cache = self._rendered_cache = None
+        super().clear()
 
     def sorted(self):
 
@@ -254,77 +539,129 @@ class Pairs(dict):
         >>> div = DIV({"foo": "spam & eggs", "bar": '<>"'})
         >>> print(div.render_attributes().strip())
         bar="&lt;>&quot;" foo="spam &amp; eggs"
-        """
 
-        def expand(key):
+        The result is cached until the attributes are next mutated, so an
+        element that is rendered repeatedly only sorts and converts its
+        attributes once:
+
+        >>> div = DIV({"class": "foo"})
+        >>> print(div)
+        <div class="foo"></div>
 
-            """This internal helper takes a key that may be spelled using the
-            shorthand for data attributes (using the dollar prefix). If it is,
-            the dollar is replaced with the `data` prefix and a hyphen. The
-            function returns the key (expanded or unchanged)."""
+        >>> div["class"] = "bar"
+        >>> print(div)
+        <div class="bar"></div>
 
-            return "data-" + key[1:] if key.startswith(dollar) else key
+        Note: Lists (and other objects) can be mutated in place (without
+        mutating the attributes dict), so the result is only cached when
+        every value is a string, number, bool or `None`, or a tuple of such
+        values (see `_immutable`):
 
-        def convert(value):
+        >>> classes = ["foo"]
+        >>> div = DIV({"class": classes})
+        >>> print(div)
+        <div class="foo"></div>
 
-            """This internal helper function takes an attribute value or the
-            subvalue in a sequential value. It returns the equivalent value,
-            according to the HTME attribute rendering logic (which is always
-            a string or `None`):
+        >>> classes.append("bar")
+        >>> print(div)
+        <div class="foo bar"></div>
 
-            * If `value` is `None`, it is returned.
-            * If `value` is `True`, the string `true` is returned. If `value`
-              is `False`, the string `false` is returned (note the case).
-            * If `value` is a number, the `str` version of `value` is returned.
-            * The subvalues in sequences (that are not `None`) are recursively
-              converted according to the same rules as terminal values, then
-              joined on spaces. The resulting string is returned.
-            * If none of the above, `value` is passed to `str` to ensure it
-              is a string, then any open angle brackets, ampersands and
-              doublequotes are replaced with escape codes (like `&amp;`)    """
+        >>> div = DIV({"class": ("foo", classes)})
+        >>> print(div)
+        <div class="foo foo bar"></div>
 
-            # map the characters that need escaping to their escape codes...
- 
-            escapees = {'<': '&lt;', '&': '&amp;', '"': '&quot;'}
+        >>> classes.append("baz")
+        >>> print(div)
+        <div class="foo foo bar baz"></div>
 
-            if value is None: return value                          # None
-            if value is True: return "true"                         # True
-            if value is False: return "false"                       # False
-            if isinstance(value, (int, float)): return str(value)   # Number
-            if isinstance(value, (list, tuple)):                    # Array
+        The cached result is never returned directly (a new list is always
+        returned), so mutating the result does not affect later renders:
 
-                values = (convert(each) for each in value if each is not None)
-                return cat(values, space) 
+        >>> div = DIV({"class": "foo"})
+        >>> div.attributes.sorted().append(("id", "bar"))
+        >>> print(div)
+        <div class="foo"></div>
+        """
 
-            return cat(escapees.get(char, char) for char in str(value))
+        cache = getattr(self, "_sorted_cache", None)
+        if cache is not None: return list(cache)
 
         # the data attributes follow any element attributes in the output,
-        # so they are collected into two lists and sorted independently...
+        # so each attribute is collected as a three-tuple that starts with a
+        # bool that is only true for data attributes, followed by the key
+        # and value, so one sort orders the element attributes before the
+        # data attributes (and each subset asciibetically by name)...
 
-        element_attributes, data_attributes = [], []
+        triples, cacheable = [], True
 
         # iterate over the attributes, expanding keys and converting values,
-        # creating the two-tuples, and appending each to the correct list...
+        # creating the three-tuples (noting whether any of the values could
+        # be mutated in place as we go)...
 
         for key, value in self.items():
 
-            key, value = expand(key), convert(value)
+            if cacheable and not _immutable(value): cacheable = False
+
+            key = _expand(key)
+            triples.append((key.startswith("data-"), key, _convert(value)))
 
-            if key.startswith("data-"): data_attributes.append((key, value))
-            else: element_attributes.append((key, value))
+        # sort the tuples, then drop the bools to get the two-tuples...
 
-        # sort both lists of tuples, concatenate them together and return the
-        # result (`sort` operates on the first item in each tuple (the key),
-        # and the result is asciibetical)...
+        triples.sort()
 
-        element_attributes.sort()
-        data_attributes.sort()
+        results = [(key, value) for data, key, value in triples]
 
-        return element_attributes + data_attributes
+        if cacheable: self._sorted_cache = tuple(results)
+        return results
+
+    def render(self):
+
+        """This method takes no args. It renders the attributes as they would
+        appear in a HTML opening tag (with a leading space, unless there are
+        no attributes to render), and returns the result as a string.
+
+        Like `sorted`, the result is cached until the attributes are next
+        mutated, so rendering an element that has not changed since it was
+        last rendered does not need to process its attributes again.
+
+        The string is only cached when `sorted` cached its result (so when
+        every value is immutable), so values that are mutated in place are
+        always rendered again, even inside a tuple:
+
+        >>> classes = ["foo"]
+        >>> attributes = Pairs({"class": ("x", classes)})
+        >>> print(attributes.render())
+         class="x foo"
+
+        >>> classes.append("bar")
+        >>> print(attributes.render())
+         class="x foo bar"
+
+        This method implements `_Configurable.render_attributes` (and is
+        doctested by it)."""
+
+        cache = getattr(self, "_rendered_cache", None)
+        if cache is not None: return cache
+
+        results = []
+
+        for key, value in self.sorted():
+
+            if value is None: continue                # ignore null attributes
+            elif value == "": results.append(key)     # fix boolean attributes
+            else: results.append(key + '="' + value + '"')    # normal pairs
+
+        rendered = space + space.join(results) if results else ""
+
+        # only cache the string when `sorted` was able to cache its result...
+
+        if getattr(self, "_sorted_cache", None) is not None:
+            self._rendered_cache = rendered
+        return rendered
 
 class Nodes(list):
 
-    """This class extends `list` without overriding any of the inherited
+    """This class extends `list` without changing any of the inherited
     functionality. The `Pairs` class has a docstring that which explains
     how `Pairs` and `Nodes` compliment each other.
     
@@ -337,7 +674,114 @@ class Nodes(list):
         element[1:-1] **= {"class": "selected"}
 
     That code updates the class of all but the first and last child of
-    `element`, skipping any children that do not have attributes."""
+    `element`, skipping any children that do not have attributes.
+
+    Note: Like `Pairs`, this class caches some derived state (the children
+    that support each kind of operator), so the methods that mutate the
+    list are overridden to discard the cache (and otherwise do exactly
+    what the methods they override do). Like `Pairs`, the cache slot is
+    not set by the constructor, so it is read with a default."""
+
+    __slots__ = ("_buckets",)
+
+    # the mutating methods, which all discard the cache before mutating...
+
+    def __delitem__(self, index):
+
+        self._buckets = None
+        super().__delitem__(index)
+
+    def __iadd__(self, other):
+
+        self._buckets = None
+        return super().__iadd__(other)
+
+    def append(self, item):
+
+        self._buckets = None
+        super().append(item)
+
+    def extend(self, items):
+
+        self._buckets = None
+        super().extend(items)
+
+    def insert(self, index, item):
+
+        self._buckets = None
+        super().insert(index, item)
+
+    def remove(self, item):
+
+        self._buckets = None
+        super().remove(item)
+
+    def pop(self, *args):
+
+        self._buckets = None
+        return super().pop(*args)
+
+    def sort(self, *args, **kargs):
+
+        self._buckets = None
+        super().sort(*args, **kargs)
+
+    def reverse(self):
+
+        self._buckets = None
+        super().reverse()
+
+    def clear(self):
+
+        self._buckets = None
+        super().clear()
+
+    @property
+    def buckets(self):
+
+        """This computed property returns a two-tuple containing a list of
+        the children that are instances of `_Configurable`, followed by a
+        list of the children that are instances of `_Parental`.
+
+        The children are only classified once, then the result is cached
+        until the list is next mutated:
+
+        >>> children = DIV(P("ElementA"), "ElementB")[:]
+        >>> children.buckets
+        ([<p>ElementA</p>], [<p>ElementA</p>])
+
+        >>> children.append(IMG())
+        >>> children.buckets
+        ([<p>ElementA</p>, <img>], [<p>ElementA</p>])
+
+        Clearing the list discards the cache too, so the operators no longer
+        reach the children that were removed:
+
+        >>> first, second = P("A"), P("B")
+        >>> children = DIV(first, second)[:]
+        >>> len(list(children.configurable_elements))
+        2
+
+        >>> children.clear()
+        >>> children **= {"class": "x"}
+        >>> first, second
+        (<p>A</p>, <p>B</p>)
+        """
+
+        buckets = getattr(self, "_buckets", None)
+
+        if buckets is None:
+
+            configurable, parental = [], []
+
+            for child in self:
+
+                if isinstance(child, _Configurable): configurable.append(child)
+                if isinstance(child, _Parental): parental.append(child)
+
+            buckets = self._buckets = configurable, parental
+
+        return buckets
 
     @property
     def configurable_elements(self):
@@ -351,7 +795,7 @@ class Nodes(list):
         <p>ElementC</p>
         """
 
-        return (child for child in self if isinstance(child, _Configurable))
+        return iter(self.buckets[0])
 
     @property
     def parental_elements(self):
@@ -364,7 +808,7 @@ class Nodes(list):
         <p>Open</p>
         """
 
-        return (child for child in self if isinstance(child, _Parental))
+        return iter(self.buckets[1])
 
     def __ipow__(self, attributes):
 
@@ -402,7 +846,7 @@ class Nodes(list):
 
         for child in self.parental_elements: child *= families
 
-    def __idiv__(self, families):
+    def __itruediv__(self, families):
 
         """This method implements the `/=` operator:
 
@@ -417,22 +861,26 @@ class Nodes(list):
     def __getitem__(self, arg):
 
         """This method overrides `list.__getitem__` to ensure slices of
-        slices recursively evaluate to `Nodes` (not `list`), which
-        depends on this method in Python 3.
-        
+        slices recursively evaluate to `Nodes` (not `list`):
+
         >>> DIV(P("ALI"), P("BOB"), P("CAZ"))[:][1]
         <p>BOB</p>
 
-        Note: Python invokes different methods to handle slice operations,
-        depending on whether it is Python 2 or 3."""
+        >>> div = DIV(P("ALI"), P("BOB"))
+        >>> type(div[:]).__name__
+        'Nodes'
+
+        >>> type(div[:][:]).__name__
+        'Nodes'
+        """
 
-        result = super(Nodes, self).__getitem__(arg)
+        result = super().__getitem__(arg)
         return Nodes(result) if type(result) is list else result
 
     def __setitem__(self, *args):
 
-        """This method ensures slices of slices recursively evaluate to
-        `Nodes` (not `list`) in Python 3.
+        """This method complements `__getitem__`, assigning to indexes, and
+        ensuring that the operators work on slices of slices:
 
         >>> children = DIV(P("ALI"), P("BOB"), P("CAZ"))[:-1]
         >>> children[1] = ASIDE("REPLACEMENT")
@@ -442,34 +890,6 @@ class Nodes(list):
         >>> SECTION(children)
         <section><p>ALI</p><aside>REPLACEMENT</aside></section>
 
-        Note: Python invokes different methods to handle slice operations,
-        depending on whether it is Python 2 or 3."""
-
-        if type(args[0]) is slice: return self[args[0]]
-        else: super(Nodes, self).__setitem__(*args)
-
-    def __getslice__(self, start, end=None):
-
-        """This method ensures slices of slices recursively evaluate to
-        `Nodes` (not `list`) in Python 2.
-
-        >>> div = DIV(P("ALI"), P("BOB"))
-        >>> type(div[:]).__name__
-        'Nodes'
-
-        >>> type(div[:][:]).__name__
-        'Nodes'
-
-        Note: Python invokes different methods to handle slice operations,
-        depending on whether it is Python 2 or 3."""
-
-        return Nodes(self[slice(start, end)])
-
-    def __setslice__(self, start, end, other):
-        
-        """This method ensures slices of slices recursively evaluate to
-        `Nodes` (not `list`) in Python 2:
-        
         >>> div = DIV(P("ALI"), P({"class": "foo"}, "BOB"), P("CAZ"))
         >>> div[1:][:] **= {"class": "bar"}
         >>> div
@@ -479,13 +899,17 @@ class Nodes(list):
         >>> div[1:][:] /= "REPLACEMENT"
         >>> div
         <div><p>ALI</p><p>REPLACEMENT</p><p>REPLACEMENT</p></div>
+        """
 
-        Note: Python invokes different methods to handle slice operations,
-        depending on whether it is Python 2 or 3."""
+        # Augmented assignments to slices (like `nodes[1:] **= attributes`)
+        # finish by assigning the result of the operator back to the slice.
+        # The operator has already updated the children in place, so those
+        # assignments are ignored:
 
-        return self[start:end]
+        if type(args[0]) is slice: return
 
-    __itruediv__ = __idiv__
+        self._buckets = None
+        super().__setitem__(*args)
 
     def blit(self, index, *children):
 
@@ -501,55 +925,158 @@ class Nodes(list):
         >>> div.children.blit(1, [SPAN("Y"), SPAN("Z")])
         >>> div
         <div><span>X</span><span>Y</span><span>Z</span><p>C</p></div>
+
+        Negative indexes count from the end, as usual:
+
+        >>> div.children.blit(-1, P("W"))
+        >>> div
+        <div><span>X</span><span>Y</span><span>Z</span><p>W</p></div>
         """
 
-        # Flatten the values, then reverse them, so they can be iteratively
-        # blitted into the array and end up back in the same order:
+        # Normalize the index (raising an `IndexError` if it is out of range),
+        # as it is used to create the slice that is being blitted over:
 
-        children = flatten(children)
-        children.reverse()
+        index = range(len(self))[index]
 
-        # Remove the single item being blitted over, then insert each of the
-        # new items, one by one:
+        # Replace the single item with all of the (flattened) children, using
+        # one slice assignment (which goes straight to `list.__setitem__`, as
+        # `Nodes.__setitem__` ignores slices):
 
-        del self[index]
-        for child in children: self.insert(index, child)
+        self._buckets = None
+        slot = slice(index, index + 1)
+        super().__setitem__(slot, flatten(children))
 
 # The feature mixins for adding blocks of functionality to the abstract
 # element classes...
 
-class _Tagged(object):
+class _TaggedType(type):
+
+    """This internal metaclass is used by the `_Tagged` mixin. It ensures the
+    constant parts of the tags (stored on each element class) are updated
+    whenever the `tagname` of an element class is assigned or deleted."""
+
+    def __setattr__(cls, name, value):
+
+        type.__setattr__(cls, name, value)
+
+        if name != "tagname": return
+
+        if "_computed_tagname" in vars(cls): del cls._computed_tagname
+        cls._retag()
+
+    def __delattr__(cls, name):
+
+        type.__delattr__(cls, name)
+
+        if name != "tagname": return
+
+        if "_computed_tagname" in vars(cls): del cls._computed_tagname
+        cls._retag()
+
+    def _retag(cls):
+
+        """This internal method stores the tag name of the class as `tagname`,
+        with the constant parts of its tags as `_opener` and `_closer`, then
+        does the same for every subclass. It is used when a class is created
+        (see `_Tagged.__init_subclass__`), and whenever its `tagname` is
+        assigned or deleted."""
+
+        # find the nearest class that defines a tag name explicitly (instead
+        # of having it computed by this method), and use that name as it is
+
+        for Class in cls.__mro__:
+
+            if "tagname" not in vars(Class): continue
+            if vars(Class).get("_computed_tagname"): continue
+
+            # a name computed for this class would hide the explicit name
+            # that it inherits, so the computed name is removed first
+
+            if vars(cls).get("_computed_tagname"):
+
+                type.__delattr__(cls, "tagname")
+                del cls._computed_tagname
+
+            tagname = vars(Class)["tagname"]
+
+            if type(tagname) is str:
+                cls._opener = openangle + tagname
+                cls._closer = openangle + slash + tagname + closedangle
+            else:
+                cls._opener = _Tagged._dynamic_opener
+                cls._closer = _Tagged._dynamic_closer
+
+            break
+
+        else: cls._compute_tagname()
+
+        # any subclasses may inherit the name, so they are updated too...
+
+        for subclass in cls.__subclasses__(): subclass._retag()
+
+    def _compute_tagname(cls):
+
+        """This internal method computes the tag name of the class from the
+        class names in its method resolution order (see `_retag`)."""
+
+        type.__setattr__(cls, "tagname", None)
+        cls._opener = cls._closer = None
+        cls._computed_tagname = True
+
+        # iterate over the element's class and parent classes in the order
+        # of inheritance (the method resolution order (the mro))
+
+        for Class in cls.__mro__:
+
+            name = Class.__name__ # get the name of the class as a string
+
+            # if the name changes when converted to uppercase, it is not a
+            # standard element class, so we need to move on to the next one
+
+            if name.upper() != name: continue
+
+            # now we have the right class name, remove any leading underscore
+            # (they are only used to prevent internal classes being exported)
+
+            if name[0] == underscore: name = name[1:]
+
+            # convert to lowercase, replace underscores with hyphens, store
+
+            name = name.lower().replace(underscore, minus)
+
+            type.__setattr__(cls, "tagname", name)
+            cls._opener = openangle + name
+            cls._closer = openangle + slash + name + closedangle
+            break
+
+class _Tagged(object, metaclass=_TaggedType):
 
     """This mixin provides abstract element classes with support for tag
-    names by implementing their `tagname` property."""
+    names by setting the `tagname` class attribute of each subclass."""
 
-    @property
-    def tagname(self):
+    __slots__ = ()
 
-        """This computed property returns the tag name, which is computed
-        from a class name by converting it to lowercase, then replacing
-        each underscore with a hyphen.
-        
-        The property is computed so that an element instance can have its
-        class reassigned (this is not officially supported, as it is only
-        safe if you use a class with the same abstract element class):
+    def __init_subclass__(cls, **kargs):
 
-        >>> element = LINK()
-        >>> element **= {"src": "img.png"}
-        >>> element.__class__ = IMG
-        >>> element
-        <img src="img.png">
+        """This method computes the tag name of each class that inherits from
+        this mixin (when the class is created, using `_TaggedType._retag`),
+        and stores it as the `tagname` class attribute. The tag name is
+        computed from the class name by converting it to lowercase, then
+        replacing each underscore with a hyphen:
 
-        The method iterates over the method resolution order, looking for
-        the first class name that does not change when it is converted to
-        uppercase. This allows element subclasses to inherit their names
-        from a standard element base class (subclasses always include at
-        least one lowercase character in their names):
+        >>> DIV.tagname, DIV().tagname
+        ('div', 'div')
+
+        The name is taken from the method resolution order, using the first
+        class name that does not change when it is converted to uppercase.
+        This allows element subclasses to inherit their names from a
+        standard element base class (subclasses always include at least
+        one lowercase character in their names):
 
         >>> class Foo(DIV): pass
         >>> Foo()
         <div></div>
-        
+
         Note: If a name starts with an underscore, that character is treated
         as though it is not there (this feature is used internally):
 
@@ -564,28 +1091,71 @@ class _Tagged(object):
         >>> class _FAKE(ForeignElement): pass
         >>> _FAKE()
         <fake/>
-        """
 
-        # iterate over the element's class and parent classes in the order
-        # of inheritance (the method resolution order (the mro))
+        Subclasses can also set their tag name explicitly (as a class
+        attribute or a property), in which case that name is used instead
+        (and inherited by their own subclasses):
 
-        for Class in self.__class__.__mro__:
+        >>> class Widget(NormalElement): tagname = "my-widget"
+        >>> Widget("x")
+        <my-widget>x</my-widget>
 
-            name = Class.__name__ # get the name of the class as a string
+        >>> class Counter(DIV):
+        ...     @property
+        ...     def tagname(self): return "x-" + str(len(self))
+        >>> Counter("a", "b")
+        <x-2>ab</x-2>
 
-            # if the name changes when converted to uppercase, it is not a
-            # standard element class, so we need to move on to the next one
+        A tag name can also be assigned (or deleted) after the class has been
+        created, which updates the class and its subclasses:
 
-            if name.upper() != name: continue
+        >>> class Foo(DIV): pass
+        >>> class Bar(Foo): pass
+        >>> Foo.tagname = "foo"
+        >>> Foo(), Bar(), Bar().tagname
+        (<foo></foo>, <foo></foo>, 'foo')
+
+        >>> del Foo.tagname
+        >>> Foo(), Bar(), Bar().tagname
+        (<div></div>, <div></div>, 'div')
+
+        The constant parts of the tags (like `<div` and `</div>`) are also
+        stored, as `_opener` and `_closer`, so the renderers only need to
+        concatenate them with the attributes and children. When the tag name
+        is not a string (like the property above), they are computed from
+        the tag name of each instance instead.
+
+        As everything is stored on the class, an element instance can still
+        have its class reassigned (this is not officially supported, as it
+        is only safe if you use a class with the same abstract element
+        class):
 
-            # now we have the right class name, remove any leading underscore
-            # (they are only used to prevent internal classes being exported)
+        >>> element = LINK()
+        >>> element **= {"src": "img.png"}
+        >>> element.__class__ = IMG
+        >>> element
+        <img src="img.png">
+        """
 
-            if name[0] == underscore: name = name[1:]
+        super().__init_subclass__(**kargs)
+        cls._retag()
 
-            # convert to lowercase, replace underscores with hyphens, return
+    @property
+    def _dynamic_opener(self):
+
+        """This internal property returns the constant part of the opening
+        tag, computed from the tag name of the instance. It replaces the
+        `_opener` class attribute when the tag name is not a string."""
+
+        return openangle + self.tagname
+
+    @property
+    def _dynamic_closer(self):
+
+        """This internal property complements `_dynamic_opener`, returning
+        the closing tag (replacing the `_closer` class attribute)."""
 
-            return name.lower().replace(underscore, minus)
+        return openangle + slash + self.tagname + closedangle
 
 class _Configurable(object):
 
@@ -595,6 +1165,8 @@ class _Configurable(object):
     If this mixin is used with `_Parental` then `_Parental` should be mixed
     in first. See `_Parental` below for more details."""
 
+    __slots__ = ()
+
     def __ipow__(self, other):
 
         """This method allows the `**=` operator to be used to merge a dict
@@ -620,7 +1192,7 @@ class _Configurable(object):
         <img class="selected" src="mugshot.png">
 
         Note: This method mutates the attributes in place.
-        Note: This method complements `NormalElement.__idiv__`, which provides
+        Note: This method complements `_Parental.__itruediv__`, which provides
         similar functionality for replacing children."""
 
         # cannot assign `other` as we need to mutate the container in place
@@ -663,27 +1235,52 @@ class _Configurable(object):
 
         """This method checks whether two elements are equal by checking that
         they both evaluate to the same string:
-        
+
         >>> x = IMG({"src": "img.png", "class": "selected"})
         >>> y = IMG({"class": "selected", "src": "img.png"})
         >>> x == y
         True
-        """
+
+        >>> IMG({"src": "img.png"}) == LINK({"src": "img.png"})
+        False
+
+        >>> DIV(P("ALI"), P("BOB")) == DIV(P("ALI"), P("CAZ"))
+        False
+
+        As equality is defined by the output, elements that are built from
+        different values, but render the same HTML, are equal:
+
+        >>> P(1) == P("1"), DIV("a", "b") == DIV("ab")
+        (True, True)
+
+        >>> DIV({"a": None}) == DIV(), DIV({"$x": 1}) == DIV({"data-x": "1"})
+        (True, True)
+
+        >>> Favicon("a.png") == META(Favicon("a.png").attributes)
+        True
+
+        Note: When the elements are certain to render the same HTML (see
+        `_Element._identical`), they are not rendered at all. Otherwise,
+        both elements are rendered and compared."""
+
+        if isinstance(other, _Element) and self._identical(other): return True
 
         return repr(self) == repr(other)
 
     def __ne__(self, other):
 
-        """This method checks that two elements are not equal by checking that
-        they both evaluate to different strings:
-        
+        """This method checks that two elements are not equal, by negating
+        the result of `__eq__`:
+
         >>> x = IMG({"src": "img.png", "class": "selected"})
         >>> y = IMG({"class": "selected", "src": "img.png"})
         >>> x != y
         False
         """
 
-        return repr(self) != repr(other)
+        return not self.__eq__(other)
+
+    __hash__ = None # elements are mutable, so they are not hashable
 
     def __len__(self):
 
@@ -715,19 +1312,11 @@ class _Configurable(object):
 
         >>> DIV({"foo": None, "bar": "include"})
         <div bar="include"></div>
-        """
-
-        if not self.attributes: return ""
-
-        results = []
 
-        for key, value in self.attributes.sorted():
-
-            if value is None: continue                # ignore null attributes
-            elif value == "": results.append(key)     # fix boolean attributes
-            else: results.append('{}="{}"'.format(key, value))  # normal pairs
+        Note: The rendering is implemented (and cached) by `Pairs.render`.
+        """
 
-        return space + cat(results, space) if results else ""
+        return self.attributes.render() if self.attributes else ""
 
 class _Parental(object):
 
@@ -740,6 +1329,8 @@ class _Parental(object):
     distinguish between keys, indexes and slices. `_Configurable` also
     implements those methods, but they always expect keys."""
 
+    __slots__ = ()
+
     def __imul__(self, *families):
 
         """This method allows families to be appended to `self.children`,
@@ -753,10 +1344,10 @@ class _Parental(object):
         Note: `Document.__imul__` operates the same way, operating on the
         `Document.tree` element."""
 
-        self.children += flatten(families)
+        self.children.extend(flatten(families))
         return self
 
-    def __idiv__(self, *families):
+    def __itruediv__(self, *families):
 
         """This method allows families to be assigned to `self.children`,
         replacing any existing children, using the `/=` operator:
@@ -768,18 +1359,14 @@ class _Parental(object):
 
         Note: This method mutates the list of children in place.
 
-        Note: The `NormalElement.__itruediv__` method is aliased to this one,
-        as Python 3 renamed it and changed its semantics (the differences
-        do not affect the operator's HTME semantics).
-
-        Note: `Document.__idiv__` maps this method to the tree.         """
+        Note: `Document.__itruediv__` maps this method to the tree.     """
 
         # This is slightly convoluted, but a slice of `Nodes` is not the same
         # instance as the instance it is a slice of, so we have to juggle the
         # values a bit to replace all the children in the original container:
 
         del self.children[:]
-        self.children += flatten(families)
+        self.children.extend(flatten(families))
         return self
 
     def __getitem__(self, arg):
@@ -802,17 +1389,32 @@ class _Parental(object):
 
         >>> print(UL(LI("Coffee"), LI("Tea"), LI("Milk"))[1:])
         [<li>Tea</li>, <li>Milk</li>]
-        
+
+        This also works when the children have been replaced with a plain
+        list:
+
+        >>> div = DIV()
+        >>> div.children = [P("ALI"), P("BOB")]
+        >>> div[1:] **= {"class": "foo"}
+        >>> div
+        <div><p>ALI</p><p class="foo">BOB</p></div>
+
         Note: For doctests operating on slices see, `Nodes`."""
 
         # If the arg is an int, return the child at that index. If the arg is
         # a slice, return an instance of `Nodes` containing the contents of
-        # the slice. Otherwise, treat the arg as an attributes dict key,
-        # and return its value:
+        # the slice (slicing `Nodes` already returns a new `Nodes`, but the
+        # children may have been replaced with a plain list). Otherwise,
+        # treat the arg as an attributes dict key, and return its value:
 
         if isinstance(arg, int): return self.children[arg]
-        elif isinstance(arg, slice): return Nodes(self.children[arg])
-        else: return self.attributes[arg]
+
+        if isinstance(arg, slice):
+
+            if type(self.children) is Nodes: return self.children[arg]
+            return Nodes(self.children[arg])
+
+        return self.attributes[arg]
 
     def __setitem__(self, arg, other):
 
@@ -832,11 +1434,13 @@ class _Parental(object):
 
         Note: For doctests operating on slices see, `Nodes`."""
 
-        # This makes the same distinction as `__getitem__`, but assigns to
-        # the index, attribute or list of `Nodes` expressed by a slice:
+        # This makes the same distinction as `__getitem__`, assigning to the
+        # index or attribute. Assignments to slices are ignored, as they are
+        # only expected at the end of augmented assignments (see the notes
+        # in `Nodes.__setitem__`):
 
         if isinstance(arg, int): self.children.blit(arg, other)
-        elif isinstance(arg, slice): return Nodes(self.children[arg])
+        elif isinstance(arg, slice): return
         else: self.attributes[arg] = other
 
     def __len__(self):
@@ -863,9 +1467,7 @@ class _Parental(object):
         <li>Milk</li>
         """
 
-        for child in self.children: yield child
-
-    __itruediv__ = __idiv__
+        return iter(self.children)
 
     def render_children(self):
 
@@ -880,10 +1482,12 @@ class _Parental(object):
         This method is generally used internally, though it is exposed to
         users, so they can use it if they wish."""
 
-        return cat(self.children)
+        return _render_list(self.children)
 
 class Signature0(object):
 
+    __slots__ = ()
+
     def __init__(self, attributes=None):
 
         """This method implements Signature 0, which takes one optional arg
@@ -910,10 +1514,12 @@ class Signature0(object):
         subclasses that override the init method."""
 
         if isinstance(attributes, Pairs): return attributes
-        return Pairs({} if attributes is None else attributes)
+        return Pairs() if attributes is None else Pairs(attributes)
 
 class Signature1(object):
 
+    __slots__ = ()
+
     def __init__(self, *children):
 
         """This method implements Signature 1, which takes zero or more
@@ -941,6 +1547,8 @@ class Signature1(object):
 
 class Signature2(object):
 
+    __slots__ = ()
+
     def __init__(self, *args):
 
         """This method implements Signature 2, which takes an optional
@@ -962,11 +1570,20 @@ class Signature2(object):
         """This static method implements the signature, so it can be used by
         subclasses that override the init method."""
 
-        args = list(args)
-        attributes = args.pop(0) if args and isinstance(args[0], dict) else {}
+        # the attributes are optional, so check the type of the first arg,
+        # and slice the attributes off the args tuple (without copying the
+        # args to a list), checking for an exact dict first (the usual case,
+        # and cheaper than `isinstance`), then for a `Pairs` instance...
+
+        if not args: return Pairs(), flatten(args)
 
-        if isinstance(attributes, Pairs): return attributes, flatten(args)
-        return Pairs(attributes), flatten(args)
+        first = args[0]
+
+        if type(first) is dict: return Pairs(first), flatten(args[1:])
+        if not isinstance(first, dict): return Pairs(), flatten(args)
+        if isinstance(first, Pairs): return first, flatten(args[1:])
+
+        return Pairs(first), flatten(args[1:])
 
 # The abstract element base class...
 
@@ -974,7 +1591,138 @@ class _Element(object):
 
     """This is the abstract base class that all elements ultimately inherit
     from. It implements the common functionality (the freezer and `write`
-    method) that all elements support."""
+    method) that all elements support.
+
+    Note: Every element class in the library declares `__slots__` (the
+    abstract element classes declare the instance attributes), so library
+    elements have no instance `__dict__`. User subclasses that do not
+    declare `__slots__` get a `__dict__` as usual:
+
+    >>> class Foo(DIV): pass
+    >>> hasattr(DIV(), "__dict__"), hasattr(Foo(), "__dict__")
+    (False, True)
+
+    Elements are rendered by streaming string fragments into a single list
+    (see `_render_into`), which is joined once, when the element is passed
+    to `str` (or `repr`). This ensures that rendering a tree is linear in
+    the size of the output, however deeply the elements are nested:
+
+    >>> tree = SPAN("x")
+    >>> for _ in range(300): tree = SPAN(tree)
+    >>> len(str(tree)) == 301 * len("<span></span>") + 1
+    True
+
+    User subclasses that override `__repr__` (or `__str__`) still work as
+    expected, as their output is used whenever they are rendered:
+
+    >>> class Bar(DIV):
+    ...     def __repr__(self): return "<bar>"
+    >>> DIV(Bar(), SPAN("baz"))
+    <div><bar><span>baz</span></div>
+
+    Likewise, user subclasses that override `render_children` have their
+    children rendered by that method (instead of being streamed):
+
+    >>> class MD(DIV):
+    ...     def render_children(self): return "CUSTOM"
+    >>> MD("x")
+    <md>CUSTOM</md>
+
+    The same applies to `render_attributes`, which is called even when the
+    attributes are empty, if a subclass overrides it:
+
+    >>> class RA(DIV):
+    ...     def render_attributes(self): return ' id="always"'
+    >>> RA("x")
+    <ra id="always">x</ra>
+    """
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kargs):
+
+        """This method notes whether each element class uses the inherited
+        rendering logic (`_Element.__repr__` with `object.__str__`), in
+        which case its instances can render themselves into the fragments
+        of their parent (see `_render_nodes`). The result is stored as
+        `cls._streams`. Other classes are always passed to `str`.
+
+        The method also notes whether the class uses the inherited method
+        for rendering children (`_Parental.render_children`), in which case
+        the children are streamed too. The result is stored as
+        `cls._streams_children`. Otherwise, `render_children` is called.
+
+        Likewise, the method notes whether the class uses the inherited
+        `_Configurable.render_attributes`, in which case the renderers skip
+        calling it when the attributes are empty. The result is stored as
+        `cls._skips_attributes`."""
+
+        super().__init_subclass__(**kargs)
+
+        inherited = cls.__repr__ is _Element.__repr__
+        cls._streams = inherited and cls.__str__ is object.__str__
+
+        children = getattr(cls, "render_children", _Parental.render_children)
+        cls._streams_children = children is _Parental.render_children
+
+        attributes = getattr(cls, "render_attributes", None)
+        cls._skips_attributes = attributes is _Configurable.render_attributes
+
+    def __repr__(self):
+
+        """This method renders the element into a list of string fragments,
+        then concatenates them. Each abstract element class implements the
+        `_render_into` method to append the fragments for its grammar."""
+
+        out = []
+        self._render_into(out)
+        return empty.join(out)
+
+    def _identical(self, other):
+
+        """This internal method takes another element, and returns `True` if
+        both elements are certain to render the same HTML, without rendering
+        either of them. That is the case when they are instances of the same
+        class (using the inherited renderers), with the same attributes, and
+        children that are either the same objects, equal strings, or
+        identical elements (recursively).
+
+        Otherwise, `False` is returned, which only means that the elements
+        need to be rendered to compare them. This method is used by
+        `_Configurable.__eq__` (and doctested by it)."""
+
+        if self is other: return True
+
+        cls = type(self)
+
+        if type(other) is not cls or not cls._streams: return False
+        if not cls._streams_children: return False
+        if type(getattr(cls, "_opener", empty)) is not str: return False
+
+        if isinstance(self, _Configurable):
+
+            if not cls._skips_attributes: return False
+
+            attributes = self.attributes.render()
+            if attributes != other.attributes.render(): return False
+
+        children = getattr(self, "children", ())
+        others = getattr(other, "children", ())
+
+        if len(children) != len(others): return False
+
+        for child, each in zip(children, others):
+
+            if child is each: continue
+
+            if type(child) is str:
+                if type(each) is str and child == each: continue
+            elif isinstance(child, _Element) and child._identical(each):
+                continue
+
+            return False
+
+        return True
 
     def __call__(self, key, *args, **kargs):
 
@@ -1009,9 +1757,27 @@ class _Element(object):
 
     def write(self, path):
 
-        """This method renders the element and writes it to the given path."""
+        """This method renders the element and writes it to the given path.
+        The fragments are written to the file as they are (using the
+        `writelines` helper), so they are never joined into one string.
+
+        If the class overrides `__repr__` (or `__str__`), the element is
+        passed to `str` instead, so the override is always respected:
 
-        write(str(self), path)
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "bar.html")
+        >>> class Bar(DIV):
+        ...     def __repr__(self): return "<bar>"
+        >>> Bar("x").write(path)
+        >>> read(path)
+        '<bar>'
+        """
+
+        if not type(self)._streams: return writelines((str(self),), path)
+
+        out = []
+        self._render_into(out)
+        writelines(out, path)
 
 # The abstract element classes...
 
@@ -1021,15 +1787,21 @@ class SpecialElement(_Element, _Parental, Signature1):
     CDATA and Legacy elements (those that have constant opening and closing
     tags, with some raw content between)."""
 
+    __slots__ = ("children", "freezer")
+
     opener, closer = empty, empty # these defaults are inherited by `Tree`
 
-    def __repr__(self):
+    def _render_into(self, out):
+
+        """This method renders special elements into `out`. It just appends
+        the `opener`, `children` and `closer`, in that order."""
 
-        """This method renders special elements. It just concatenates the
-        `opener`, `children` and `closer` together."""
+        out.append(self.opener)
 
-        children = self.render_children()
-        return "{0}{1}{2}".format(self.opener, children, self.closer)
+        if not self._streams_children: out.append(self.render_children())
+        elif self.children: _render_nodes(self.children, out)
+
+        out.append(self.closer)
 
 class VoidElement(_Element, _Tagged, _Configurable, Signature0):
 
@@ -1037,14 +1809,22 @@ class VoidElement(_Element, _Tagged, _Configurable, Signature0):
     elements (those that can never have children or raw content, and close
     automatically)."""
 
-    def __repr__(self):
+    __slots__ = ("attributes", "freezer")
+
+    def _render_into(self, out):
 
         """This method renders void elements, and uses the void grammar:
 
             <tagname attributes>                                            """
 
-        attributes = self.render_attributes()
-        return "<{0}{1}>".format(self.tagname, attributes)
+        # most elements have no attributes, so the opener is used as is, if
+        # the attributes are empty (without calling `render_attributes`,
+        # unless the class overrides it)...
+
+        opener = self._opener
+        if self.attributes or not self._skips_attributes:
+            opener += self.render_attributes()
+        out.append(opener + closedangle)
 
 class NormalElement(_Element, _Tagged, _Parental, _Configurable, Signature2):
 
@@ -1052,15 +1832,27 @@ class NormalElement(_Element, _Tagged, _Parental, _Configurable, Signature2):
     elements (those that always use the normal grammar, even when they have
     no children)."""
 
-    def __repr__(self):
+    __slots__ = ("attributes", "children", "freezer")
+
+    def _render_into(self, out):
 
         """This method renders normal elements, and uses the normal grammar:
 
             <tagname attributes>children</tagname>                          """
 
-        children = self.render_children()
-        attributes = self.render_attributes()
-        return "<{0}{1}>{2}</{0}>".format(self.tagname, attributes, children)
+        # skip rendering the attributes and children when they are empty
+        # (which is the common case for attributes, and for many leaves),
+        # unless the class overrides the method that renders them...
+
+        opener = self._opener
+        if self.attributes or not self._skips_attributes:
+            opener += self.render_attributes()
+        out.append(opener + closedangle)
+
+        if not self._streams_children: out.append(self.render_children())
+        elif self.children: _render_nodes(self.children, out)
+
+        out.append(self._closer)
 
 class ForeignElement(_Element, _Tagged, _Parental, _Configurable, Signature2):
 
@@ -1068,7 +1860,9 @@ class ForeignElement(_Element, _Tagged, _Parental, _Configurable, Signature2):
     CIRCLE elements (those that can optionally self-close when they have no
     children)."""
 
-    def __repr__(self):
+    __slots__ = ("attributes", "children", "freezer")
+
+    def _render_into(self, out):
 
         """This method renders foreign elements. It uses the normal grammar
         when there are one or more children:
@@ -1077,214 +1871,61 @@ class ForeignElement(_Element, _Tagged, _Parental, _Configurable, Signature2):
 
         It uses the self-closing grammar when there are no children:
 
-            <tagname attributes/>                                           """
+            <tagname attributes/>
+
+        For example:
+
+        >>> G({"id": "dots"}, CIRCLE({"r": 5}), CIRCLE({"r": 9}))
+        <g id="dots"><circle r="5"/><circle r="9"/></g>
+        """
+
+        opener = self._opener
+        if self.attributes or not self._skips_attributes:
+            opener += self.render_attributes()
 
-        attributes = self.render_attributes()
+        if not self.children: return out.append(opener + slash + closedangle)
 
-        return "<{0}{1}/>".format(self.tagname, attributes)
+        out.append(opener + closedangle)
 
-        children = self.render_children()
+        if self._streams_children: _render_nodes(self.children, out)
+        else: out.append(self.render_children())
 
-        return "<{0}{1}>{2}</{0}>".format(self.tagname, attributes, children)
+        out.append(self._closer)
 
 # The concrete Void Element classes...
 
-class AREA(VoidElement): pass
-class BASE(VoidElement): pass
-class BR(VoidElement): pass
-class COL(VoidElement): pass
-class EMBED(VoidElement): pass
-class HR(VoidElement): pass
-class IMG(VoidElement): pass
-class INPUT(VoidElement): pass
-class LINK(VoidElement): pass
-class META(VoidElement): pass
-class PARAM(VoidElement): pass
-class SOURCE(VoidElement): pass
-class TRACK(VoidElement): pass
-class WBR(VoidElement): pass
+_define(VoidElement, """
+    AREA BASE BR COL EMBED HR IMG INPUT LINK META PARAM SOURCE TRACK WBR
+""")
 
 # The concrete Normal Element classes...
 
-class A(NormalElement): pass
-class ABBR(NormalElement): pass
-class ADDRESS(NormalElement): pass
-class APPLET(NormalElement): pass
-class ARTICLE(NormalElement): pass
-class ASIDE(NormalElement): pass
-class AUDIO(NormalElement): pass
-class B(NormalElement): pass
-class BDI(NormalElement): pass
-class BDO(NormalElement): pass
-class BLOCKQUOTE(NormalElement): pass
-class BODY(NormalElement): pass
-class BUTTON(NormalElement): pass
-class CANVAS(NormalElement): pass
-class CAPTION(NormalElement): pass
-class CITE(NormalElement): pass
-class CODE(NormalElement): pass
-class COLGROUP(NormalElement): pass
-class CONTENT(NormalElement): pass
-class DATA(NormalElement): pass
-class DATALIST(NormalElement): pass
-class DD(NormalElement): pass
-class DEL(NormalElement): pass
-class DESC(NormalElement): pass
-class DETAILS(NormalElement): pass
-class DFN(NormalElement): pass
-class DIALOG(NormalElement): pass
-class DIR(NormalElement): pass
-class DIV(NormalElement): pass
-class DL(NormalElement): pass
-class DT(NormalElement): pass
-class ELEMENT(NormalElement): pass
-class EM(NormalElement): pass
-class FIELDSET(NormalElement): pass
-class FIGCAPTION(NormalElement): pass
-class FIGURE(NormalElement): pass
-class FOOTER(NormalElement): pass
-class FORM(NormalElement): pass
-class H1(NormalElement): pass
-class H2(NormalElement): pass
-class H3(NormalElement): pass
-class H4(NormalElement): pass
-class H5(NormalElement): pass
-class H6(NormalElement): pass
-class HEAD(NormalElement): pass
-class HEADER(NormalElement): pass
-class HGROUP(NormalElement): pass
-class HTML(NormalElement): pass
-class I(NormalElement): pass
-class INS(NormalElement): pass
-class KBD(NormalElement): pass
-class LABEL(NormalElement): pass
-class LEGEND(NormalElement): pass
-class LI(NormalElement): pass
-class MAIN(NormalElement): pass
-class MAP(NormalElement): pass
-class MARK(NormalElement): pass
-class MENU(NormalElement): pass
-class MENUITEM(NormalElement): pass
-class METER(NormalElement): pass
-class NAV(NormalElement): pass
-class NOBR(NormalElement): pass
-class NOEMBED(NormalElement): pass
-class NOSCRIPT(NormalElement): pass
-class OBJECT(NormalElement): pass
-class OL(NormalElement): pass
-class OPTGROUP(NormalElement): pass
-class OPTION(NormalElement): pass
-class OUTPUT(NormalElement): pass
-class P(NormalElement): pass
-class PICTURE(NormalElement): pass
-class PRE(NormalElement): pass
-class PROGRESS(NormalElement): pass
-class Q(NormalElement): pass
-class RP(NormalElement): pass
-class RT(NormalElement): pass
-class RTC(NormalElement): pass
-class RUBY(NormalElement): pass
-class S(NormalElement): pass
-class SAMP(NormalElement): pass
-class SCRIPT(NormalElement): pass
-class SECTION(NormalElement): pass
-class SELECT(NormalElement): pass
-class SHADOW(NormalElement): pass
-class SLOT(NormalElement): pass
-class SMALL(NormalElement): pass
-class SPAN(NormalElement): pass
-class STRONG(NormalElement): pass
-class STYLE(NormalElement): pass
-class SUB(NormalElement): pass
-class SUMMARY(NormalElement): pass
-class SUP(NormalElement): pass
-class SVG(NormalElement): pass
-class TABLE(NormalElement): pass
-class TBODY(NormalElement): pass
-class TD(NormalElement): pass
-class TEMPLATE(NormalElement): pass
-class TEXTAREA(NormalElement): pass
-class TFOOT(NormalElement): pass
-class TH(NormalElement): pass
-class THEAD(NormalElement): pass
-class TIME(NormalElement): pass
-class TITLE(NormalElement): pass
-class TR(NormalElement): pass
-class TT(NormalElement): pass
-class U(NormalElement): pass
-class UL(NormalElement): pass
-class VAR(NormalElement): pass
-class VIDEO(NormalElement): pass
+_define(NormalElement, """
+    A ABBR ADDRESS APPLET ARTICLE ASIDE AUDIO B BDI BDO BLOCKQUOTE BODY
+    BUTTON CANVAS CAPTION CITE CODE COLGROUP CONTENT DATA DATALIST DD DEL
+    DESC DETAILS DFN DIALOG DIR DIV DL DT ELEMENT EM FIELDSET FIGCAPTION
+    FIGURE FOOTER FORM H1 H2 H3 H4 H5 H6 HEAD HEADER HGROUP HTML I INS KBD
+    LABEL LEGEND LI MAIN MAP MARK MENU MENUITEM METER NAV NOBR NOEMBED
+    NOSCRIPT OBJECT OL OPTGROUP OPTION OUTPUT P PICTURE PRE PROGRESS Q RP RT
+    RTC RUBY S SAMP SCRIPT SECTION SELECT SHADOW SLOT SMALL SPAN STRONG
+    STYLE SUB SUMMARY SUP SVG TABLE TBODY TD TEMPLATE TEXTAREA TFOOT TH
+    THEAD TIME TITLE TR TT U UL VAR VIDEO
+""")
 
 # The concrete Foreign Element classes...
 
-class ANIMATE(ForeignElement): pass
-class ANIMATEMOTION(ForeignElement): pass
-class ANIMATETRANSFORM(ForeignElement): pass
-class CIRCLE(ForeignElement): pass
-class CLIPPATH(ForeignElement): pass
-class COLOR_PROFILE(ForeignElement): pass
-class DEFS(ForeignElement): pass
-class DISCARD(ForeignElement): pass
-class ELLIPSE(ForeignElement): pass
-class FEBLEND(ForeignElement): pass
-class FECOLORMATRIX(ForeignElement): pass
-class FECOMPONENTTRANSFER(ForeignElement): pass
-class FECOMPOSITE(ForeignElement): pass
-class FECONVOLVEMATRIX(ForeignElement): pass
-class FEDIFFUSELIGHTING(ForeignElement): pass
-class FEDISPLACEMENTMAP(ForeignElement): pass
-class FEDISTANTLIGHT(ForeignElement): pass
-class FEDROPSHADOW(ForeignElement): pass
-class FEFLOOD(ForeignElement): pass
-class FEFUNCA(ForeignElement): pass
-class FEFUNCB(ForeignElement): pass
-class FEFUNCG(ForeignElement): pass
-class FEFUNCR(ForeignElement): pass
-class FEGAUSSIANBLUR(ForeignElement): pass
-class FEIMAGE(ForeignElement): pass
-class FEMERGE(ForeignElement): pass
-class FEMERGENODE(ForeignElement): pass
-class FEMORPHOLOGY(ForeignElement): pass
-class FEOFFSET(ForeignElement): pass
-class FEPOINTLIGHT(ForeignElement): pass
-class FESPECULARLIGHTING(ForeignElement): pass
-class FESPOTLIGHT(ForeignElement): pass
-class FETILE(ForeignElement): pass
-class FETURBULENCE(ForeignElement): pass
-class FILTER(ForeignElement): pass
-class FONT(ForeignElement): pass
-class FOREIGNOBJECT(ForeignElement): pass
-class G(ForeignElement): pass
-class HATCH(ForeignElement): pass
-class HATCHPATH(ForeignElement): pass
-class IMAGE(ForeignElement): pass
-class LINE(ForeignElement): pass
-class LINEARGRADIENT(ForeignElement): pass
-class MARKER(ForeignElement): pass
-class MASK(ForeignElement): pass
-class MESH(ForeignElement): pass
-class MESHGRADIENT(ForeignElement): pass
-class MESHPATCH(ForeignElement): pass
-class MESHROW(ForeignElement): pass
-class METADATA(ForeignElement): pass
-class MPATH(ForeignElement): pass
-class PATH(ForeignElement): pass
-class PATTERN(ForeignElement): pass
-class POLYGON(ForeignElement): pass
-class POLYLINE(ForeignElement): pass
-class RADIALGRADIENT(ForeignElement): pass
-class RECT(ForeignElement): pass
-class SET(ForeignElement): pass
-class SOLIDCOLOR(ForeignElement): pass
-class STOP(ForeignElement): pass
-class SWITCH(ForeignElement): pass
-class SYMBOL(ForeignElement): pass
-class TEXT(ForeignElement): pass
-class TEXTPATH(ForeignElement): pass
-class TSPAN(ForeignElement): pass
-class USE(ForeignElement): pass
-class VIEW(ForeignElement): pass
+_define(ForeignElement, """
+    ANIMATE ANIMATEMOTION ANIMATETRANSFORM CIRCLE CLIPPATH COLOR_PROFILE
+    DEFS DISCARD ELLIPSE FEBLEND FECOLORMATRIX FECOMPONENTTRANSFER
+    FECOMPOSITE FECONVOLVEMATRIX FEDIFFUSELIGHTING FEDISPLACEMENTMAP
+    FEDISTANTLIGHT FEDROPSHADOW FEFLOOD FEFUNCA FEFUNCB FEFUNCG FEFUNCR
+    FEGAUSSIANBLUR FEIMAGE FEMERGE FEMERGENODE FEMORPHOLOGY FEOFFSET
+    FEPOINTLIGHT FESPECULARLIGHTING FESPOTLIGHT FETILE FETURBULENCE FILTER
+    FONT FOREIGNOBJECT G HATCH HATCHPATH IMAGE LINE LINEARGRADIENT MARKER
+    MASK MESH MESHGRADIENT MESHPATCH MESHROW METADATA MPATH PATH PATTERN
+    POLYGON POLYLINE RADIALGRADIENT RECT SET SOLIDCOLOR STOP SWITCH SYMBOL
+    TEXT TEXTPATH TSPAN USE VIEW
+""")
 
 # The concrete Special Element classes...
 
@@ -1297,6 +1938,8 @@ class Comment(SpecialElement):
     <!--hello world-->
     """
 
+    __slots__ = ()
+
     opener, closer = "<!--", "-->"
 
 class CData(SpecialElement):
@@ -1308,76 +1951,9 @@ class CData(SpecialElement):
     <![CDATA[hello world]]>
     """
 
-    opener, closer = "<![CDATA[", "]]>"
-
-# The magic element classes that are only used by the engine...
-
-class _HTML(NormalElement):
-
-    """This class implements the main `html` element, which has a different
-    signature to other elements, and works differently. Instances of this
-    element are used to represent the document as a whole (the doctype is
-    prepended to this element automatically when it is represented). This
-    class is only used internally."""
-
-    def __init__(self, lang, *signature):
-
-        """This constructor takes a `lang` argument, which sets the `lang`
-        attribute of the HTML element (if it is not `None` and the `lang`
-        has not already been set (by `Engine.html_attributes`)).
-        
-        The `lang` arg is followed by the standard signature for normal
-        elements. In practice, `Engine` passes the `html_attributes` dict,
-        followed by two  children (the HEAD and BODY elements).
-
-        Note: The `_HTML.__repr__` method prepends the doctype tag to
-        rendered output automatically:
-
-        >>> _HTML("es", {"class": "foo"})
-        <!doctype html><html class="foo" lang="es"></html>
-
-        >>> _HTML("es", {"lang": "jp", "class": "foo"})
-        <!doctype html><html class="foo" lang="jp"></html>
-        """
-
-        super(_HTML, self).__init__(*signature)
-        
-        if (lang is None) or ("lang" in self.attributes): return
-            
-        self["lang"] = lang
-
-    def __repr__(self):
-    
-        """This overrides `NormalElement.__repr__` so the representation can
-        be concatenated to the HTML5 doctype to create a complete document."""
-
-        return "<!doctype html>" + super(_HTML, self).__repr__()
-
-class _BODY(NormalElement):
-
-    """This class implements the `body` element, which is only directly used
-    internally (but exposed to library users as `Document.body`).
-    
-    The constructor takes a reference to the instance of `Document` that the
-    body element is bound to. The reference is used by the `__repr__` method
-    to append the augmentation to the body. The remaining arguments have the
-    same signature as standard normal elements."""
-
-    def __init__(self, document, *signature):
-
-        super(_BODY, self).__init__(*signature)
-        self.document = document
+    __slots__ = ()
 
-    def __repr__(self):
-
-        """This overrides `NormalElement.__repr__` so that the augmentation
-        can be automatically appended to the body in the rendered output."""
-
-        children = self.render_children()
-        attributes = self.render_attributes()
-        augmentation = self.document.render_augmentation()
-        args = self.tagname, attributes, children, augmentation
-        return "<{0}{1}>{2}{3}</{0}>".format(*args)
+    opener, closer = "<![CDATA[", "]]>"
 
 # The Magic Element Helper Classes...
 
@@ -1389,6 +1965,8 @@ class Tree(SpecialElement):
 
     Note: An instance of this class is exposed to users as `Engine.tree`."""
 
+    __slots__ = ()
+
 class Legacy(SpecialElement):
 
     """This class implements the Internet Explorer less-than-or-equal tags
@@ -1398,6 +1976,8 @@ class Legacy(SpecialElement):
     <!--[if lte IE 7]><p>upgrade</p><p>now</p><![endif]-->
     """
 
+    __slots__ = ("opener",)
+
     closer = "<![endif]-->"
 
     def __init__(self, version, *children):
@@ -1428,12 +2008,14 @@ class Favicon(META):
     <meta href="icon.png" rel="icon" sizes="64x64 128x128" type="image/png">
     """
 
+    __slots__ = ()
+
     def __init__(self, href, *sizes):
 
         if not sizes: size, image_type = "any", "image/svg+xml"
         else:
 
-            size = space.join( "{0}x{0}".format(size) for size in sizes )
+            size = space.join([f"{size}x{size}" for size in sizes])
             image_type = "image/" + filetype(href)
 
         self.attributes = Pairs(
@@ -1455,9 +2037,11 @@ class Mobicon(Favicon):
     <meta href="icon.png" rel="apple-touch-icon" sizes="16x16">
     """
 
+    __slots__ = ()
+
     def __init__(self, *args):
 
-        super(Mobicon, self).__init__(*args)
+        super().__init__(*args)
         self["rel"] = "apple-touch-icon"
         self.attributes.pop("type")
 
@@ -1474,9 +2058,11 @@ class Anchor(A):
     <a class="button" href="/about">The about us page.</a>
     """
 
+    __slots__ = ()
+
     def __init__(self, href, *signature):
 
-        super(Anchor, self).__init__(*signature)
+        super().__init__(*signature)
         self["href"] = href
 
 class Style(LINK):
@@ -1489,9 +2075,11 @@ class Style(LINK):
     <link href="/static/magic.css" rel="stylesheet">
     """
 
+    __slots__ = ()
+
     def __init__(self, path, *signature):
 
-        super(Style, self).__init__(*signature)
+        super().__init__(*signature)
         self **= {"rel": "stylesheet", "href": path}
 
 class Logic(SCRIPT):
@@ -1504,13 +2092,33 @@ class Logic(SCRIPT):
     <script src="/static/wizardry.js"></script>
     """
 
+    __slots__ = ()
+
     def __init__(self, path, *args):
 
-        super(Logic, self).__init__(*args)
+        super().__init__(*args)
         self["src"] = path
 
 # The Hypertext Markup Engine...
 
+# the engine attributes that configure the viewport, each paired with the
+# name of its field in the content of the viewport metatag (in order)...
+
+_viewport_fields = (
+    ("width", "width"),                 ("height", "height"),
+    ("scale", "initial-scale"),         ("scalable", "user-scalable"),
+    ("minimum_scale", "minimum-scale"), ("maximum_scale", "maximum-scale")
+)
+
+# the names of the head renderers that are decorated with `_cached` (which
+# is used by `Engine.freeze_many` to find the renderers for an attribute)...
+
+_head_renderers = (
+    "render_charset", "render_ie_version", "render_base", "render_title",
+    "render_author", "render_description", "render_viewport",
+    "render_favicon", "render_manifest"
+)
+
 class Engine(object): # TODO: improve doctest
 
     """This class models HTML5 documents. The API is covered in the intro and
@@ -1531,8 +2139,25 @@ class Engine(object): # TODO: improve doctest
 
     >>> str(docs) == readlines("test.htme")[0]
     True
+
+    Note: Like the elements, the engine declares `__slots__` (one for each
+    engine attribute, plus the freezer and the render cache), so engines
+    have no instance `__dict__` (user subclasses still get one, unless
+    they declare `__slots__` too):
+
+    >>> class Docs(Engine): pass
+    >>> hasattr(Engine(), "__dict__"), hasattr(Docs(), "__dict__")
+    (False, True)
     """
 
+    __slots__ = (
+        "lang", "charset", "ie_version", "base", "title", "author",
+        "description", "manifest", "favicon", "viewport", "scale",
+        "scalable", "minimum_scale", "maximum_scale", "width", "height",
+        "tree", "installation", "augmentation", "icons", "html_attributes",
+        "head_attributes", "body_attributes", "freezer", "_render_cache"
+    )
+
     def __init__(
 
         # `self` and the three miscellaneous attributes...
@@ -1587,11 +2212,6 @@ class Engine(object): # TODO: improve doctest
         a dict can also be passed in, and it will be used directly
         (without copying)."""
 
-        # This function returns its first arg if its first arg is expressly
-        # not `None`; otherwise it returns its second arg:
-
-        extant = lambda arg, default: default if arg is None else arg
-
         # Directly copy arguments with simple defaults over to `self`:
 
         self.lang = lang
@@ -1611,15 +2231,24 @@ class Engine(object): # TODO: improve doctest
         self.manifest = manifest
         self.favicon = favicon
 
-        # Use the `extant` function to handle the mutable defaults:
-
-        self.tree = extant(tree, Tree())
-        self.icons = extant(icons, [])
-        self.installation = extant(installation, [])
-        self.augmentation = extant(augmentation, [])
-        self.html_attributes = extant(html_attributes, {})
-        self.head_attributes = extant(head_attributes, {})
-        self.body_attributes = extant(body_attributes, {})
+        # Handle the mutable defaults (each arg is used if it is expressly
+        # not `None`, else a new default is created, but only then):
+
+        if tree is None: tree = Tree()
+        if icons is None: icons = []
+        if installation is None: installation = []
+        if augmentation is None: augmentation = []
+        if html_attributes is None: html_attributes = {}
+        if head_attributes is None: head_attributes = {}
+        if body_attributes is None: body_attributes = {}
+
+        self.tree = tree
+        self.icons = icons
+        self.installation = installation
+        self.augmentation = augmentation
+        self.html_attributes = html_attributes
+        self.head_attributes = head_attributes
+        self.body_attributes = body_attributes
 
         # Copy the freezer from an element or engine if one is passed in,
         # else use the arg directly (still defaulting to an empty dict):
@@ -1630,6 +2259,10 @@ class Engine(object): # TODO: improve doctest
 
         else: self.freezer = {} if freezer is None else freezer
 
+        # Initialise the cache used by `_render_cached`:
+
+        self._render_cache = {}
+
     def __repr__(self):
 
         """This method makes the representation of the document render and
@@ -1640,18 +2273,149 @@ class Engine(object): # TODO: improve doctest
         Note: The design of the library fundamentally depends on this method
         never mutating `self`."""
 
-        head = HEAD(
-            self.head_attributes,       self.render_charset(),
-            self.render_ie_version(),   self.render_base(),
-            self.render_title(),        self.render_author(),
-            self.render_description(),  self.render_viewport(),
-            self.render_favicon(),      self.render_icons(),
-            self.render_manifest(),     self.render_installation()
-        )
+        out = []
+        self._render_into(out)
+        return empty.join(out)
+
+    def _render_into(self, out):
+
+        """This method renders the document into `out` (a list of strings),
+        just like `_Element._render_into`. The whole document is streamed
+        into the one list. The html, head and body tags are rendered here
+        directly (as they always use the normal grammar), so no elements
+        need to be created to wrap the head and body:
+
+        >>> out = []
+        >>> Engine()._render_into(out)
+        >>> empty.join(out) == str(Engine())
+        True
+
+        The `lang` attribute of the html element is set to `self.lang`
+        (unless it is `None`, or `lang` is in `self.html_attributes`):
+
+        >>> doc = Engine(lang="es", html_attributes={"class": "foo"})
+        >>> str(doc).startswith('<!doctype html><html class="foo" lang="es">')
+        True
+
+        >>> doc.html_attributes["lang"] = "jp"
+        >>> str(doc).startswith('<!doctype html><html class="foo" lang="jp">')
+        True
+
+        The augmentation list is streamed directly, unless a subclass
+        overrides `render_augmentation`, in which case its output is used:
+
+        >>> class Custom(Engine):
+        ...     def render_augmentation(self): return "<!-- end -->"
+        >>> str(Custom()).endswith("<!-- end --></body></html>")
+        True
+
+        The same goes for the icons and installation lists in the head:
+
+        >>> class Custom(Engine):
+        ...     def render_icons(self): return "<!-- icons -->"
+        ...     def render_installation(self): return "<!-- installed -->"
+        >>> "<!-- icons -->" in str(Custom())
+        True
+
+        >>> "<!-- installed --></head>" in str(Custom())
+        True
+        """
+
+        # the html attributes are copied, so `lang` can be added without
+        # mutating `self.html_attributes`...
+
+        html_attributes = Pairs(self.html_attributes)
+
+        if self.lang is not None and "lang" not in html_attributes:
+
+            html_attributes["lang"] = self.lang
+
+        head_attributes = Signature0.signature(self.head_attributes)
+        body_attributes = Signature0.signature(self.body_attributes)
+
+        out.append("<!doctype html><html" + html_attributes.render() + ">")
+        out.append("<head" + head_attributes.render() + closedangle)
+
+        cached = self._render_cached
+
+        _render_nodes((
+            cached("render_charset"),   cached("render_ie_version"),
+            cached("render_base"),      cached("render_title"),
+            cached("render_author"),    cached("render_description"),
+            cached("render_viewport"),  cached("render_favicon")
+        ), out)
+
+        # the icons and installation are rendered directly into `out` (just
+        # like the tree and augmentation), as they are lists of elements,
+        # unless a subclass overrides the method that renders the list...
+
+        cls = type(self)
+
+        if cls.render_icons is Engine.render_icons:
+            _render_nodes(self.icons, out)
+        else: out.append(self.render_icons())
+
+        out.append(cached("render_manifest"))
+
+        if cls.render_installation is Engine.render_installation:
+            _render_nodes(self.installation, out)
+        else: out.append(self.render_installation())
+
+        out.append("</head><body" + body_attributes.render() + closedangle)
+        _render_nodes((self.tree,), out)
+
+        if cls.render_augmentation is Engine.render_augmentation:
+            _render_nodes(self.augmentation, out)
+        else: out.append(self.render_augmentation())
+
+        out.append("</body></html>")
+
+    def _render_cached(self, name):
+
+        """This method takes the name of a renderer (like `render_title`),
+        calls it, and returns the result as a string. If the renderer was
+        decorated with `_cached`, the string is cached, along with the
+        values of the attributes it depends on, and the cached string is
+        reused for as long as each attribute is still the same object.
+
+        Only the values of immutable types (strings, numbers, bools and
+        `None`) are cached, so (for example) a base that is an element is
+        always rendered again, in case it has been mutated:
+
+        >>> doc = Engine(base="/")
+        >>> doc._render_cached("render_base")
+        '<base href="/">'
+
+        >>> doc.base = BASE({"target": "_blank"})
+        >>> doc._render_cached("render_base")
+        '<base target="_blank">'
+
+        >>> doc.base **= {"href": "/"}
+        >>> doc._render_cached("render_base")
+        '<base href="/" target="_blank">'
+        """
+
+        method = getattr(type(self), name)
+        names = getattr(method, "names", None)
+
+        if names is None: return str(method(self))
+
+        values = [getattr(self, each) for each in names]
+        entry = self._render_cache.get(name)
 
-        body = _BODY(self, self.body_attributes, str(self.tree))
+        if entry is not None:
 
-        return str(_HTML(self.lang, self.html_attributes, head, body))
+            for old, new in zip(entry[0], values):
+                if old is not new: break
+            else: return entry[1]
+
+        result = str(method(self))
+
+        for value in values:
+            if type(value) not in _scalars: break
+        else: self._render_cache[name] = values, result
+
+        return result
 
     def __call__(self, key, *args, **kargs):
 
@@ -1671,10 +2435,17 @@ class Engine(object): # TODO: improve doctest
         self.tree *= other
         return self
 
-    def __idiv__(self, other):
+    def __itruediv__(self, other):
 
         """This method implements the `/=` operator for documents, so they
-        work like elements, passing everything on to `self.tree`."""
+        work like elements, passing everything on to `self.tree`:
+
+        >>> doc = Engine()
+        >>> doc *= P("old")
+        >>> doc /= P("new")
+        >>> for child in doc: print(child)
+        <p>new</p>
+        """
 
         self.tree /= other
         return self
@@ -1706,14 +2477,23 @@ class Engine(object): # TODO: improve doctest
         >>> b *= [P, P, P]
         >>> a == b
         True
+
+        A document is always equal to itself, and never equal to an object
+        that is not a document, so neither case renders anything:
+
+        >>> a == a, a == str(a)
+        (True, False)
         """
 
+        if self is other: return True
+        if not isinstance(other, Engine): return False
+
         return repr(self) == repr(other)
 
     def __ne__(self, other):
 
-        """This method checks that two documents are not equal by checking
-        that they both evaluate to different strings.
+        """This method checks that two documents are not equal, by negating
+        the result of `__eq__`.
 
         >>> a, b = Engine(), Engine()
         >>> a *= P(), P(), P()
@@ -1722,7 +2502,7 @@ class Engine(object): # TODO: improve doctest
         True
         """
 
-        return repr(self) != repr(other)
+        return not self.__eq__(other)
 
     def __len__(self):
 
@@ -1752,7 +2532,7 @@ class Engine(object): # TODO: improve doctest
         <p></p>
         """
 
-        for child in self.tree: yield child
+        return iter(self.tree)
 
     def install(self, *tags):
         
@@ -1765,7 +2545,7 @@ class Engine(object): # TODO: improve doctest
         <script src="logic.js"></script>
         """
 
-        self.installation += list(tags)
+        self.installation.extend(tags)
 
     def augment(self, *tags):
         
@@ -1778,7 +2558,7 @@ class Engine(object): # TODO: improve doctest
         <script src="logic.js"></script>
         """
 
-        self.augmentation += list(tags)
+        self.augmentation.extend(tags)
 
     def iconify(self, *elements):
 
@@ -1791,7 +2571,7 @@ class Engine(object): # TODO: improve doctest
         <meta href="logo.png" rel="icon" sizes="16x16" type="image/png">
         """
 
-        self.icons += list(elements)
+        self.icons.extend(elements)
 
     @staticmethod
     def un(array, args):
@@ -1809,18 +2589,38 @@ class Engine(object): # TODO: improve doctest
         - Non-Integers: The `remove` method of `array` is invoked, passing
           the item as the only arg (possibly raising a `ValueError`).
 
+        The integers are handled first, so the other items are removed from
+        what remains. Integers and other items can be mixed freely:
+
+        >>> array = [P("a"), P("b"), P("c"), P("d")]
+        >>> Engine.un(array, (-1, P("b"), 0))
+        >>> array
+        [<p>c</p>]
+
         See `uninstall`, `unaugment` and `uniconify` for more information
         on how this method is used, including doctests."""
 
         if args:
 
-            args = list(args)
-            args.sort()
+            # partition the args in one pass, normalising the indices (so
+            # negative and duplicate indices refer to the same items)...
+
+            indices, targets, others = range(len(array)), set(), []
+
+            for arg in args:
+
+                if isinstance(arg, int): targets.add(indices[arg])
+                else: others.append(arg)
 
-            for offset, arg in enumerate(args):
+            # delete the indexed items from the highest index down, so that
+            # deleting an item never moves any of the others...
 
-                if isinstance(arg, int): del array[arg - offset]
-                else: array.remove(arg)
+            for index in sorted(targets, reverse=True): del array[index]
+
+            # the other items are removed by equality, one at a time, as
+            # elements are unhashable (so cannot be collected into a set)...
+
+            for other in others: array.remove(other)
 
         else: del array[:]
 
@@ -1875,7 +2675,7 @@ class Engine(object): # TODO: improve doctest
         <link href="style.css" rel="stylesheet">
         """
 
-        return cat(self.installation)
+        return _render_list(self.installation)
 
     def render_augmentation(self):
 
@@ -1891,7 +2691,7 @@ class Engine(object): # TODO: improve doctest
         <script src="logic.js"></script>
         """
 
-        return cat(self.augmentation)
+        return _render_list(self.augmentation)
 
     @staticmethod
     def expand(candidate, fallback):
@@ -1902,15 +2702,25 @@ class Engine(object): # TODO: improve doctest
 
         If the candidate is `None`, an empty string is returned. If it is an
         element, then the candidate itself is returned, otherwise the fallback
-        is returned.
+        is returned:
+
+        >>> Engine.expand(None, META({"charset": "utf-8"})) == empty
+        True
 
-        This is used internally by many of the internal `Engine.render_*`
-        methods (and doctested by them)."""
+        >>> Engine.expand(META({"charset": "ascii"}), None)
+        <meta charset="ascii">
 
-        if candidate is None: return ""
+        >>> Engine.expand("utf-8", META({"charset": "utf-8"}))
+        <meta charset="utf-8">
+
+        This is used internally by many of the `Engine.render_*` methods
+        (and is also available to the renderers of subclasses)."""
+
+        if candidate is None: return empty
         if isinstance(candidate, _Element): return candidate
         return fallback
 
+    @_cached("charset")
     def render_charset(self):
 
         """This method expands the meta charset engine attribute:
@@ -1924,6 +2734,7 @@ class Engine(object): # TODO: improve doctest
 
         return self.expand(self.charset, META({"charset": self.charset}))
 
+    @_cached("ie_version")
     def render_ie_version(self):
 
         """This method expands the `X-UA-Compatible` engine attribute:
@@ -1940,9 +2751,10 @@ class Engine(object): # TODO: improve doctest
 
         return self.expand(self.ie_version, META({
             "http-equiv": "x-ua-compatible",
-            "content": "ie={}".format(self.ie_version)
+            "content": f"ie={self.ie_version}"
         }))
 
+    @_cached("base")
     def render_base(self):
 
         """This method expands the `base` engine attribute:
@@ -1961,6 +2773,7 @@ class Engine(object): # TODO: improve doctest
 
         return self.expand(self.base, BASE({"href": self.base}))
 
+    @_cached("title")
     def render_title(self):
 
         """This method renders the `title` element, which is required. Its
@@ -1975,6 +2788,7 @@ class Engine(object): # TODO: improve doctest
 
         return TITLE(self.title)
 
+    @_cached("author")
     def render_author(self):
 
         """This method expands the `author` engine attribute:
@@ -1990,6 +2804,7 @@ class Engine(object): # TODO: improve doctest
             "name": "author", "content": self.author
         }))
 
+    @_cached("description")
     def render_description(self):
 
         """This method expands the `description` engine attribute:
@@ -2001,10 +2816,11 @@ class Engine(object): # TODO: improve doctest
         <meta content="spam and eggs" name="description">
         """
 
-        return self.expand(self.description,  META({
+        return self.expand(self.description, META({
             "name": "description", "content": self.description
         }))
 
+    @_cached("viewport", *[name for name, field in _viewport_fields])
     def render_viewport(self):
 
         """This method renders the viewport META tag that sets the initial
@@ -2045,32 +2861,14 @@ class Engine(object): # TODO: improve doctest
 
         values = []
 
-        if self.width is not None:
-
-            values.append("width={0}".format(self.width))
-
-        if self.height is not None:
-
-            values.append("height={0}".format(self.height))
-
-        if self.scale is not None:
-
-            values.append("initial-scale={0}".format(self.scale))
+        for name, field in _viewport_fields:
 
-        if self.scalable is not None:
+            value = getattr(self, name)
+            if value is not None: values.append(f"{field}={value}")
 
-            values.append("user-scalable={0}".format(self.scalable))
-
-        if self.minimum_scale is not None:
-
-            values.append("minimum-scale={0}".format(self.minimum_scale))
-
-        if self.maximum_scale is not None:
-
-            values.append("maximum-scale={0}".format(self.maximum_scale))
-
-        return META({"name": "viewport", "content": cat(values, ", ")})
+        return META({"name": "viewport", "content": ", ".join(values)})
 
+    @_cached("favicon")
     def render_favicon(self):
 
         """This method expands the `favicon` engine attribute:
@@ -2102,8 +2900,9 @@ class Engine(object): # TODO: improve doctest
         <meta href="logo.svg" rel="apple-touch-icon" sizes="any">
         """
 
-        return cat(self.icons)
+        return _render_list(self.icons)
 
+    @_cached("manifest")
     def render_manifest(self):
 
         """This method expands the `manifest` engine attribute:
@@ -2127,12 +2926,101 @@ class Engine(object): # TODO: improve doctest
 
         self.freezer[key] = str(self)
 
+    def freeze_many(self, name, items):
+
+        """This method takes the name of an engine attribute and an iterable
+        of `(key, value)` pairs. For each pair, the document is frozen (just
+        like `freeze`) using the key, with the attribute set to the value.
+        The attribute is restored to its original value afterwards:
+
+        >>> doc = Engine()
+        >>> doc *= P("spam")
+        >>> doc.freeze_many("title", [("a", "Alpha"), ("b", "Beta")])
+        >>> doc.freezer["b"] == str(Engine(title="Beta", tree=doc.tree))
+        True
+
+        >>> doc.title
+        ''
+
+        If the attribute only affects one of the head renderers (like the
+        `title` or `description`), the document is only rendered once (as
+        a prefix and suffix), and that renderer's output is patched in for
+        each value. Otherwise, each document is rendered in full."""
+
+        cls, original = type(self), getattr(self, name)
+
+        # the fast path requires the standard document renderer, and for all
+        # of the head renderers to name their attributes (with `_cached`), so
+        # any renderer that is overridden without naming them is unsafe...
+
+        standard = cls._render_into is Engine._render_into
+        standard = standard and cls.__repr__ is Engine.__repr__
+        standard = standard and cls.freeze is Engine.freeze
+
+        names = [getattr(getattr(cls, each), "names", None)
+                 for each in _head_renderers]
+
+        targets = [renderer for renderer, each in zip(_head_renderers, names)
+                   if each is not None and name in each]
+
+        try:
+
+            if standard and None not in names and len(targets) == 1:
+
+                # render the document with a unique placeholder value, then
+                # split it around the target renderer's output (if that is
+                # unique within the document)...
+
+                target = targets[0]
+                setattr(self, name, "\0htme\0")
+                piece, document = self._render_cached(target), str(self)
+
+                if document.count(piece) == 1:
+
+                    prefix, _, suffix = document.partition(piece)
+
+                    for key, value in items:
+
+                        setattr(self, name, value)
+                        piece = self._render_cached(target)
+                        self.freezer[key] = prefix + piece + suffix
+
+                    return
+
+            for key, value in items:
+
+                setattr(self, name, value)
+                self.freeze(key)
+
+        finally: setattr(self, name, original)
+
     def write(self, path):
 
         """This method converts the instance to a HTML document and writes it
-        to the given path."""
+        to the given path (writing the fragments, just like `_Element.write`,
+        without joining them into one string first).
+
+        Like `_Element.write`, subclasses that override `__repr__` (or
+        `__str__`) are passed to `str` instead:
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "doc.html")
+        >>> class Custom(Engine):
+        ...     def __str__(self): return "<!-- custom -->"
+        >>> Custom().write(path)
+        >>> read(path)
+        '<!-- custom -->'
+        """
+
+        cls = type(self)
+        streams = cls.__repr__ is Engine.__repr__
+        streams = streams and cls.__str__ is object.__str__
+
+        if not streams: return writelines((str(self),), path)
 
-        write(str(self), path)
+        out = []
+        self._render_into(out)
+        writelines(out, path)
 
 # Run the doctests if this file is executed as a script...
 